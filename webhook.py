@@ -1,20 +1,39 @@
 import os
 import sys
 import json
+import hmac
+import heapq
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
 import threading
-import traceback
-from datetime import datetime
-from flask import Flask, request, abort
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, request, abort
 from twilio.twiml.messaging_response import MessagingResponse
 from twilio.request_validator import RequestValidator
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from google.oauth2.service_account import Credentials
 
-# Force unbuffered logging so print() always shows in Render logs
+# Force unbuffered logging so log lines always show in Render logs
 sys.stdout.reconfigure(line_buffering=True)
 
+# Request threads only enqueue log records; a listener thread does the stdout writes
+_log_q = queue.Queue()
+_log_listener = logging.handlers.QueueListener(_log_q, logging.StreamHandler(sys.stdout))
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+logger = logging.getLogger("webhook")
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+logger.addHandler(logging.handlers.QueueHandler(_log_q))
+logger.propagate = False
+
 app = Flask(__name__)
-print("[STARTUP] Webhook service started and ready.")
+logger.info("[STARTUP] Webhook service started and ready.")
 
 # ==========================
 # 🔐 Environment Config
@@ -22,6 +41,11 @@ print("[STARTUP] Webhook service started and ready.")
 SERVICE_ACCOUNT_JSON = os.environ["SERVICE_ACCOUNT_JSON"]
 SHEET_URL = os.environ["SHEET_URL"]
 TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN", "")
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+SHEET_CACHE_TTL = int(os.environ.get("SHEET_CACHE_TTL", "120"))
+# Panama national numbers are 8 digits; stored phones may lack the +507 prefix
+PHONE_TAIL_DIGITS = int(os.environ.get("PHONE_TAIL_DIGITS", "8"))
+COALESCE_SECONDS = float(os.environ.get("COALESCE_SECONDS", "1.5"))
 
 # ==========================
 # 📑 Google Sheets Setup
@@ -30,9 +54,29 @@ SCOPES = ["https://spreadsheets.google.com/feeds",
           "https://www.googleapis.com/auth/drive"]
 
 creds_dict = json.loads(SERVICE_ACCOUNT_JSON)
-creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPES)
+creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
 gc = gspread.authorize(creds)
-sheet = gc.open_by_url(SHEET_URL).sheet1
+# Reuse keep-alive connections across webhooks and retry transient Sheets errors
+gc.http_client.session.mount("https://", HTTPAdapter(
+    pool_connections=20, pool_maxsize=50,
+    # raise_on_status=False hands the last error response back so gspread raises APIError
+    max_retries=Retry(total=3, backoff_factor=0.2,
+                      status_forcelist=[429, 500, 502, 503, 504],
+                      raise_on_status=False),
+))
+SH = gc.open_by_url(SHEET_URL)
+sheet = SH.sheet1
+MSG_WS = None
+
+def message_log_ws(reopen: bool = False):
+    """Cached "Message Log" worksheet; reopen=True re-fetches the workbook (e.g. after a rename)."""
+    global SH, MSG_WS
+    if reopen:
+        SH = gc.open_by_url(SHEET_URL)
+        MSG_WS = None
+    if MSG_WS is None:
+        MSG_WS = SH.worksheet("Message Log")
+    return MSG_WS
 
 # ---------------------------------------
 # Header aliasing for mixed names
@@ -51,154 +95,528 @@ _HEADER_LOGICALS = {
     "sid": ["SID", "sid"]
 }
 
-def _build_header_map(ws):
-    headers = ws.row_values(1)
-    norm_to_actual = {_normalize(h): h for h in headers}
+# normalized variant -> (logical key, priority); earlier variants win
+_VARIANT_TO_LOGICAL = {}
+for _key, _variants in _HEADER_LOGICALS.items():
+    for _prio, _v in enumerate(_variants):
+        _VARIANT_TO_LOGICAL.setdefault(_normalize(_v), (_key, _prio))
+
+def _build_header_map(headers):
     result = {}
-    for key, variants in _HEADER_LOGICALS.items():
-        for v in variants:
-            n = _normalize(v)
-            if n in norm_to_actual:
-                result[key] = norm_to_actual[n]
-                break
+    best = {}
+    for h in headers:
+        hit = _VARIANT_TO_LOGICAL.get(_normalize(h))
+        if hit is None:
+            continue
+        key, prio = hit
+        if prio <= best.get(key, prio):
+            best[key] = prio
+            result[key] = h
     return result
 
-HEADER_MAP = _build_header_map(sheet)
+# Customer sheet header row, cached so writes don't re-read it every time
+HEADERS: list[str] = []
+HEADER_MAP: dict[str, str] = {}
+HEADER_COL: dict[str, int] = {}  # actual header -> 0-based column
+PHONE_COL = None
+# Logical keys known to have no column in the current HEADERS
+_MISSING_LOGICALS: set[str] = set()
+# Guards swapping the header globals above as one unit
+HEADER_LOCK = threading.Lock()
+
+def refresh_headers(headers=None):
+    global HEADERS, HEADER_MAP, HEADER_COL, PHONE_COL
+    if headers is None:
+        headers = sheet.row_values(1)
+    header_map = _build_header_map(headers)
+    header_col = {}
+    for i, h in enumerate(headers):
+        header_col.setdefault(h, i)
+    phone_col = header_col.get(header_map.get("phone", "Phone"))
+
+    with HEADER_LOCK:
+        HEADERS, HEADER_MAP, HEADER_COL, PHONE_COL = headers, header_map, header_col, phone_col
+        _MISSING_LOGICALS.clear()
+    logger.info("[HEADERS] Loaded %d headers", len(headers))
+
+refresh_headers()
+
+def _resolve_columns(updates_logical: dict):
+    """Returns ([(1-based column, value)], [logical keys with no column])."""
+    with HEADER_LOCK:
+        header_map, header_col = HEADER_MAP, HEADER_COL
+    cols = []
+    missing = []
+    for logical_key, value in updates_logical.items():
+        # Try to map via HEADER_MAP, fallback: look directly in headers
+        col = header_col.get(header_map.get(logical_key, logical_key))
+        if col is None:
+            missing.append(logical_key)
+        else:
+            cols.append((col + 1, value))
+    return cols, missing
 
 def set_row_values(ws, row_idx: int, updates_logical: dict):
     """
-    Generic updater: works for Customer sheet (dnc, optin_date, etc.)
-    and Message Log sheet (Status, Error, SID).
+    Customer sheet updater (dnc, optin_date, etc.): writes only the
+    mapped cells of the row in a single batch request.
     """
-    headers = ws.row_values(1)
-    cur = ws.row_values(row_idx)
-    cur += [""] * (len(headers) - len(cur))
-    hmap = {h: i for i, h in enumerate(headers)}
-
-    for logical_key, value in updates_logical.items():
-        # Try to map via HEADER_MAP
-        actual = None
-        if logical_key in HEADER_MAP:
-            actual = HEADER_MAP[logical_key]
-        else:
-            # fallback: look directly in headers
-            if logical_key in headers:
-                actual = logical_key
-        if actual and actual in hmap:
-            cur[hmap[actual]] = value
-
-    rng = ws.range(row_idx, 1, row_idx, len(headers))
-    for i, cell in enumerate(rng):
-        cell.value = cur[i]
-    ws.update_cells(rng, value_input_option="USER_ENTERED")
+    cols, missing = _resolve_columns(updates_logical)
+    with HEADER_LOCK:
+        unseen = [k for k in missing if k not in _MISSING_LOGICALS]
+    if unseen:
+        # Header row may have changed since it was cached; re-read once per change
+        refresh_headers()
+        cols, missing = _resolve_columns(updates_logical)
+        with HEADER_LOCK:
+            _MISSING_LOGICALS.update(missing)
+    if missing:
+        logger.warning("[WARN] No column for %s in row %s, skipped", missing, row_idx)
+
+    data = [
+        {"range": gspread.utils.rowcol_to_a1(row_idx, col), "values": [[value]]}
+        for col, value in cols
+    ]
+    if data:
+        ws.batch_update(data, value_input_option="USER_ENTERED")
 
 def iso_now():
-    return datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
 
 def normalize_e164(wa_from: str) -> str:
-    return (wa_from or "").replace("whatsapp:", "").strip()
+    if not wa_from:
+        return ""
+    return wa_from.removeprefix("whatsapp:").strip()
+
+# Drops "+", "-" and spaces in a single C-level pass
+_STRIP_TBL = str.maketrans("", "", "+- ")
+
+def _digits(s: str) -> str:
+    return s.translate(_STRIP_TBL)
 
 # ==========================
-# 📌 FIXED phone matching
+# 📌 Phone index (in-memory)
 # ==========================
-def find_row_index_by_phone(e164: str):
-    records = sheet.get_all_records()
-    phone_header = HEADER_MAP.get("phone", "Phone")
-
-    # Normalize incoming number
-    clean_incoming = e164.replace("+", "").replace(" ", "").replace("-", "")
+# digits -> (sheet row index, row values); rebuilt from the sheet, patched on writes
+PHONE_INDEX: dict[str, tuple[int, list[str]]] = {}
+# last PHONE_TAIL_DIGITS digits -> PHONE_INDEX keys in sheet order, for the suffix-match rule
+PHONE_TAIL_INDEX: dict[str, list[str]] = {}
+# stored numbers shorter than PHONE_TAIL_DIGITS (e.g. 7-digit landlines), in sheet order
+PHONE_SHORT_KEYS: list[str] = []
+INDEX_LOCK = threading.RLock()
+INDEX_BUILT_AT = 0.0
+
+def build_phone_index():
+    global INDEX_BUILT_AT
+    values = sheet.get_all_values()
+    if values and values[0] != HEADERS:
+        refresh_headers(values[0])
+    index = {}
+    tails = {}
+    short_keys = []
+    if values and PHONE_COL is not None:
+        for idx, row in enumerate(values[1:], start=2):
+            clean_stored = _digits(row[PHONE_COL].strip())
+            # First row wins on duplicates, same as the old top-down scan
+            if clean_stored and clean_stored not in index:
+                index[clean_stored] = (idx, row)
+                if len(clean_stored) >= PHONE_TAIL_DIGITS:
+                    tails.setdefault(clean_stored[-PHONE_TAIL_DIGITS:], []).append(clean_stored)
+                else:
+                    short_keys.append(clean_stored)
+
+    with INDEX_LOCK:
+        PHONE_INDEX.clear()
+        PHONE_INDEX.update(index)
+        PHONE_TAIL_INDEX.clear()
+        PHONE_TAIL_INDEX.update(tails)
+        PHONE_SHORT_KEYS[:] = short_keys
+        INDEX_BUILT_AT = time.monotonic()
+    logger.info("[INDEX] Loaded %d phone numbers", len(index))
+
+def _lookup_phone(clean_incoming: str):
+    with INDEX_LOCK:
+        hit = PHONE_INDEX.get(clean_incoming)
+        if hit:
+            return hit
+        # Suffix rule: stored numbers may be missing the country code (or vice versa)
+        if len(clean_incoming) < PHONE_TAIL_DIGITS:
+            # Rare (Twilio sends full E.164): check every stored number
+            candidates = PHONE_INDEX
+        else:
+            candidates = PHONE_TAIL_INDEX.get(clean_incoming[-PHONE_TAIL_DIGITS:], []) + PHONE_SHORT_KEYS
+        matches = [PHONE_INDEX[clean_stored] for clean_stored in candidates
+                   if clean_incoming.endswith(clean_stored) or clean_stored.endswith(clean_incoming)]
+    # First matching row in the sheet wins, like the old top-down scan
+    return min(matches, key=lambda hit: hit[0], default=None)
 
-    for idx, row in enumerate(records, start=2):
-        phone = str(row.get(phone_header, "")).strip()
-        if not phone:
-            continue
-        clean_stored = phone.replace("+", "").replace(" ", "").replace("-", "")
-        if clean_incoming == clean_stored:
-            return idx, row
-        if clean_incoming.endswith(clean_stored):
-            return idx, row
-        if clean_stored.endswith(clean_incoming):
-            return idx, row
-    return None, None
+def find_row_index_by_phone(e164: str):
+    clean_incoming = _digits(e164)
+    if not clean_incoming:
+        return None, None
+
+    # Rows may have been inserted, deleted or re-sorted in the sheet
+    stale = time.monotonic() - INDEX_BUILT_AT > SHEET_CACHE_TTL
+    if stale:
+        build_phone_index()
+
+    hit = _lookup_phone(clean_incoming)
+    if hit is None and not stale:
+        # Row may have been added to the sheet after the index was built
+        build_phone_index()
+        hit = _lookup_phone(clean_incoming)
+    return hit or (None, None)
+
+def update_cached_row(row: list, updates_logical: dict):
+    with INDEX_LOCK:
+        cols, _missing = _resolve_columns(updates_logical)
+        for col, value in cols:
+            if col <= len(row):
+                row[col - 1] = value
+
+build_phone_index()
 
 # ==========================
 # 🔒 Twilio Validation
 # ==========================
-validator = RequestValidator(TWILIO_AUTH_TOKEN)
+VALIDATE = bool(TWILIO_AUTH_TOKEN)
+validator = RequestValidator(TWILIO_AUTH_TOKEN) if VALIDATE else None
+
 def is_valid_twilio_request(req) -> bool:
-    if not TWILIO_AUTH_TOKEN:
+    if not VALIDATE:
         return True
     signature = req.headers.get("X-Twilio-Signature", "")
-    return validator.validate(req.url, req.form.to_dict(), signature)
+    if not signature:
+        return False
+    # The validator reads MultiDicts via getlist(), no need to copy the form
+    return validator.validate(req.url, req.form, signature)
 
 # ==========================
 # 📩 Background handlers
 # ==========================
-def handle_unsubscribe(row_idx):
+# Bounded pool so a burst of webhooks queues work instead of spawning threads
+EXEC = ThreadPoolExecutor(max_workers=int(os.environ.get("BG_WORKERS", "8")),
+                          thread_name_prefix="bg")
+atexit.register(EXEC.shutdown, wait=False)
+
+# row_idx -> (cached row, merged logical updates) waiting to be written
+PENDING: dict[int, tuple[list, dict]] = {}
+PENDING_LOCK = threading.Lock()
+# (due monotonic time, row_idx) for PENDING rows; drained by one flusher thread
+_FLUSH_HEAP: list[tuple[float, int]] = []
+_FLUSH_COND = threading.Condition(PENDING_LOCK)
+_FLUSHER_STOP = threading.Event()
+
+def queue_row_update(row_idx, row, updates):
+    """
+    Coalesces writes to the same row within COALESCE_SECONDS, so a quick
+    STOP then START hits Sheets once with the final state.
+    """
+    with PENDING_LOCK:
+        pending = PENDING.get(row_idx)
+        if pending:
+            pending[1].update(updates)
+            return
+        PENDING[row_idx] = (row, dict(updates))
+        heapq.heappush(_FLUSH_HEAP, (time.monotonic() + COALESCE_SECONDS, row_idx))
+        _FLUSH_COND.notify()
+
+def _row_flusher():
+    """Single long-lived thread: waits for the earliest due row, hands the write to EXEC."""
+    with _FLUSH_COND:
+        while not _FLUSHER_STOP.is_set():
+            if not _FLUSH_HEAP:
+                _FLUSH_COND.wait()
+                continue
+            due, row_idx = _FLUSH_HEAP[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                _FLUSH_COND.wait(delay)
+                continue
+            heapq.heappop(_FLUSH_HEAP)
+            EXEC.submit(_flush_row, row_idx)
+
+threading.Thread(target=_row_flusher, name="row-flusher", daemon=True).start()
+
+def _flush_row(row_idx):
+    with PENDING_LOCK:
+        pending = PENDING.pop(row_idx, None)
+    if pending:
+        _write_row(row_idx, *pending)
+
+def _write_row(row_idx, row, updates):
     try:
-        print(f"[DEBUG] Entering handle_unsubscribe for row {row_idx}")
-        set_row_values(sheet, row_idx, {
+        set_row_values(sheet, row_idx, updates)
+        update_cached_row(row, updates)
+        logger.info("[SHEET] Updated row %s successfully: %s", row_idx, updates)
+    except Exception:
+        logger.exception("[ERROR] Failed to update row %s", row_idx)
+
+def _flush_on_exit():
+    """
+    Writes coalesced rows and queued status events still waiting at
+    shutdown; a STOP was already confirmed to the user.
+    """
+    with _FLUSH_COND:
+        _FLUSHER_STOP.set()
+        _FLUSH_COND.notify()
+        pending = list(PENDING.items())
+        PENDING.clear()
+        _FLUSH_HEAP.clear()
+    for row_idx, (row, updates) in pending:
+        _write_row(row_idx, row, updates)
+    _drain_status_queue()
+
+# Registered after EXEC.shutdown, so it runs first (atexit is LIFO)
+atexit.register(_flush_on_exit)
+
+def handle_unsubscribe(row_idx, row, ts):
+    try:
+        logger.debug("[DEBUG] Entering handle_unsubscribe for row %s", row_idx)
+        queue_row_update(row_idx, row, {
             "dnc": "TRUE",
-            "optout_date": iso_now()
+            "optout_date": ts
         })
-        print(f"[UNSUBSCRIBE] Updated row {row_idx} successfully")
-    except Exception as e:
-        print("[ERROR] handle_unsubscribe failed:", e)
-        traceback.print_exc()
+        logger.info("[UNSUBSCRIBE] Queued update for row %s", row_idx)
+    except Exception:
+        logger.exception("[ERROR] handle_unsubscribe failed")
 
-def handle_resubscribe(row_idx):
+def handle_resubscribe(row_idx, row, ts):
     try:
-        print(f"[DEBUG] Entering handle_resubscribe for row {row_idx}")
-        set_row_values(sheet, row_idx, {
+        logger.debug("[DEBUG] Entering handle_resubscribe for row %s", row_idx)
+        queue_row_update(row_idx, row, {
             "dnc": "FALSE",
             "optin_source": "Resubscribe",
-            "optin_date": iso_now()
+            "optin_date": ts
         })
-        print(f"[RESUBSCRIBE] Updated row {row_idx} successfully")
-    except Exception as e:
-        print("[ERROR] handle_resubscribe failed:", e)
-        traceback.print_exc()
+        logger.info("[RESUBSCRIBE] Queued update for row %s", row_idx)
+    except Exception:
+        logger.exception("[ERROR] handle_resubscribe failed")
+
+def process_inbound(from_num, handler, ts):
+    """Looks up the sender's row off the request path, then runs handler(row_idx, row, ts)."""
+    try:
+        row_idx, row = find_row_index_by_phone(from_num)
+    except Exception:
+        logger.exception("[ERROR] Phone lookup failed for %s", from_num)
+        return
+
+    if not row_idx:
+        logger.warning("[WARN] No row found for %s", from_num)
+        return
+    handler(row_idx, row, ts)
 
 # ==========================
 # 📩 Inbound Handler
 # ==========================
+_UNSUB = frozenset({"SALIR", "UNSUBSCRIBE", "CANCEL", "END", "STOP", "BAJA", "ALTO"})
+_RESUB = frozenset({"START", "YES", "SI"})
+
 @app.post("/twilio/inbound")
 def inbound():
     if not is_valid_twilio_request(request):
         abort(403)
 
-    from_num = normalize_e164(request.form.get("From"))
-    body = (request.form.get("Body") or "").strip().upper()
+    form = request.form
+    from_num = normalize_e164(form.get("From"))
+    body = form.get("Body", "").strip().upper()
     resp = MessagingResponse()
+    ts = iso_now()
 
-    print(f"[INBOUND] Message from {from_num}: {body}")
+    logger.info("[INBOUND] Message from %s: %s", from_num, body)
 
-    row_idx, _row = find_row_index_by_phone(from_num)
-    if not row_idx:
-        print(f"[WARN] No row found for {from_num}")
-        return str(resp)
+    # Replies don't depend on the sheet, so answer Twilio first and
+    # do the lookup + write in the background pool
 
     # Unsubscribe
-    if body in {"SALIR", "UNSUBSCRIBE", "CANCEL", "END", "STOP", "BAJA", "ALTO"}:
+    if body in _UNSUB:
         resp.message(
             "❌ You’ve been unsubscribed from Sardaar Ji promotions. "
             "Reply START to resubscribe. / "
             "❌ Has sido dado de baja de Sardaar Ji. "
             "Responde START para suscribirte de nuevo."
         )
-        threading.Thread(target=handle_unsubscribe, args=(row_idx,)).start()
+        EXEC.submit(process_inbound, from_num, handle_unsubscribe, ts)
         return str(resp)
 
     # Resubscribe
-    if body in {"START", "YES", "SI"}:
+    if body in _RESUB:
         resp.message("✅ Subscribed / ✅ Suscripción activada")
-        threading.Thread(target=handle_resubscribe, args=(row_idx,)).start()
+        EXEC.submit(process_inbound, from_num, handle_resubscribe, ts)
         return str(resp)
 
     # Default fallback
     resp.message("🍛 Thanks for contacting Sardaar Ji Indian Cuisine Panama!")
     return str(resp)
 
+# ==========================
+# 🗂️ Message Log SID index
+# ==========================
+MSG_HEADERS = ["Date","Name","Phone","Type","Message","Status","Error","SID"]
+SID_COL = MSG_HEADERS.index("SID") + 1
+STATUS_COL = MSG_HEADERS.index("Status") + 1
+ERROR_COL = MSG_HEADERS.index("Error") + 1
+
+# SID -> Message Log row index; rebuilt from the sheet, extended on appends
+SID_INDEX: dict[str, int] = {}
+SID_LOCK = threading.Lock()
+SID_INDEX_BUILT_AT = None
+# Orphans (status for a SID that was never logged) should stay rare; watch this in the logs
+STATUS_STATS = {"updated": 0, "orphaned": 0}
+
+def build_sid_index(ws):
+    global SID_INDEX_BUILT_AT
+    values = ws.get_all_values()
+
+    # Ensure headers are correct
+    if not values or values[0][:len(MSG_HEADERS)] != MSG_HEADERS:
+        ws.update("A1:H1", [MSG_HEADERS])
+
+    index = {}
+    for i, r in enumerate(values[1:], start=2):  # start=2 for row index
+        sid_in_sheet = r[SID_COL - 1].strip() if len(r) >= SID_COL else ""
+        # First row wins on duplicates, same as the old top-down scan
+        if sid_in_sheet:
+            index.setdefault(sid_in_sheet, i)
+
+    with SID_LOCK:
+        SID_INDEX.clear()
+        SID_INDEX.update(index)
+        SID_INDEX_BUILT_AT = time.monotonic()
+    logger.info("[INDEX] Loaded %d message SIDs", len(index))
+
+def find_rows_by_sid(ws, sids):
+    """Returns {sid: row index} for the SIDs already in the Message Log."""
+    stale = SID_INDEX_BUILT_AT is None or time.monotonic() - SID_INDEX_BUILT_AT > SHEET_CACHE_TTL
+    if stale:
+        build_sid_index(ws)
+
+    with SID_LOCK:
+        rows = {sid: SID_INDEX[sid] for sid in sids if sid in SID_INDEX}
+    if len(rows) < len(sids) and not stale:
+        # Rows may have been logged since the index was built, re-read before appending
+        build_sid_index(ws)
+        with SID_LOCK:
+            rows = {sid: SID_INDEX[sid] for sid in sids if sid in SID_INDEX}
+    return rows
+
+def _append_orphan_status_rows(ws, items):
+    """Cold path: logs status events whose SID has no Message Log row yet."""
+    now = time.strftime("%d-%m-%Y %H:%M")
+    result = ws.append_rows([
+        [now, "", to_number, "Status Update", "", status, error, sid]
+        for sid, status, error, to_number in items
+    ])
+    # e.g. "'Message Log'!A42:H44"
+    updated_range = result.get("updates", {}).get("updatedRange", "")
+    if updated_range:
+        first_cell = updated_range.rsplit("!", 1)[-1].split(":")[0]
+        first_row = gspread.utils.a1_to_rowcol(first_cell)[0]
+        with SID_LOCK:
+            for offset, (sid, *_rest) in enumerate(items):
+                if sid:
+                    SID_INDEX[sid] = first_row + offset
+    STATUS_STATS["orphaned"] += len(items)
+    for sid, *_rest in items:
+        logger.info("[STATUS] ➕ Appended new row for SID %s", sid)
+    logger.info("[STATUS] Orphaned %d of %d status events so far",
+                STATUS_STATS["orphaned"], STATUS_STATS["orphaned"] + STATUS_STATS["updated"])
+
+def write_status_batch(items):
+    """
+    Applies queued (sid, status, error, to_number) events with one
+    batch_update for known SIDs and one append_rows for the rest.
+    """
+    # Later events for the same SID win; blank SIDs can't be matched, always append
+    latest = {}
+    orphans = []
+    for sid, status, error, to_number in items:
+        if sid:
+            latest[sid] = (status, error, to_number)
+        else:
+            orphans.append((sid, status, error, to_number))
+
+    try:
+        ws = message_log_ws()
+        rows = find_rows_by_sid(ws, latest)
+    except (gspread.exceptions.APIError, gspread.exceptions.WorksheetNotFound) as e:
+        # Only a missing workbook/tab is worth reopening; 429/5xx go to the writer's
+        # error log rather than doubling the calls against an exhausted quota
+        if isinstance(e, gspread.exceptions.APIError) and e.response.status_code != 404:
+            raise
+        ws = message_log_ws(reopen=True)
+        rows = find_rows_by_sid(ws, latest)
+
+    data = []
+    for sid, (status, error, to_number) in latest.items():
+        i = rows.get(sid)
+        if i is None:
+            orphans.append((sid, status, error, to_number))
+            continue
+        data.append({"range": gspread.utils.rowcol_to_a1(i, STATUS_COL), "values": [[status]]})
+        data.append({"range": gspread.utils.rowcol_to_a1(i, ERROR_COL), "values": [[error]]})
+        logger.info("[STATUS] ✅ Updating row %s for SID %s → %s", i, sid, status)
+
+    if data:
+        ws.batch_update(data, value_input_option="USER_ENTERED")
+        STATUS_STATS["updated"] += len(data) // 2
+    if orphans:
+        _append_orphan_status_rows(ws, orphans)
+
+# ==========================
+# 🧵 Status writer
+# ==========================
+# Twilio sends status callbacks in bursts (queued → sent → delivered → read);
+# a single writer drains them so each burst costs one or two Sheets calls
+STATUS_BATCH_MAX = 100
+STATUS_BATCH_WINDOW = 0.05
+STATUS_RETRY_DELAY = 2.0
+_status_q = queue.Queue()
+# Serializes the writer thread and the exit-time drain
+_STATUS_WRITE_LOCK = threading.Lock()
+
+def _write_status_items(items):
+    """Writes one batch, retrying once; the SIDs are logged if both attempts fail."""
+    for attempt in (1, 2):
+        try:
+            with _STATUS_WRITE_LOCK:
+                write_status_batch(items)
+            return
+        except Exception:
+            logger.exception("[ERROR] Failed to write %d status updates to sheet (attempt %d)",
+                             len(items), attempt)
+        if attempt == 1:
+            time.sleep(STATUS_RETRY_DELAY)
+    logger.error("[ERROR] Dropped status updates for SIDs: %s",
+                 ", ".join(sid or "<blank>" for sid, *_rest in items))
+
+def _drain_status_queue():
+    items = []
+    while True:
+        try:
+            items.append(_status_q.get_nowait())
+        except queue.Empty:
+            break
+    for start in range(0, len(items), STATUS_BATCH_MAX):
+        _write_status_items(items[start:start + STATUS_BATCH_MAX])
+
+def _status_writer():
+    while True:
+        items = [_status_q.get()]
+        deadline = time.monotonic() + STATUS_BATCH_WINDOW
+        while len(items) < STATUS_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(_status_q.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        _write_status_items(items)
+
+threading.Thread(target=_status_writer, name="status-writer", daemon=True).start()
+
 # ==========================
 # 📦 Delivery Status Handler
 # ==========================
@@ -207,60 +625,53 @@ def status_callback():
     if not is_valid_twilio_request(request):
         abort(403)
 
-    data = request.form.to_dict()
-    sid = (data.get("MessageSid") or data.get("SmsSid") or "").strip()
-    status = (data.get("MessageStatus") or "").strip()
-    error_code = (data.get("ErrorCode") or "").strip()
-    error_message = (data.get("ErrorMessage") or "").strip()
-    to_number = normalize_e164(data.get("To"))
+    form = request.form
+    sid = (form.get("MessageSid") or form.get("SmsSid") or "").strip()
+    status = (form.get("MessageStatus") or "").strip()
+    error_code = (form.get("ErrorCode") or "").strip()
+    error_message = (form.get("ErrorMessage") or "").strip()
+    to_number = normalize_e164(form.get("To"))
 
-    print(f"[STATUS] SID={sid} To={to_number} Status={status} Error={error_code} {error_message}")
+    logger.info("[STATUS] SID=%s To=%s Status=%s Error=%s %s",
+                sid, to_number, status, error_code, error_message)
 
-    try:
-        sh = gc.open_by_url(SHEET_URL)
-        ws = sh.worksheet("Message Log")
-
-        # Ensure headers are correct
-        required_headers = ["Date","Name","Phone","Type","Message","Status","Error","SID"]
-        headers = ws.row_values(1)
-        if headers != required_headers:
-            ws.update("A1:H1", [required_headers])
-            headers = required_headers
-
-        # Column indexes
-        sid_col = headers.index("SID") + 1
-        status_col = headers.index("Status") + 1
-        error_col = headers.index("Error") + 1
-
-        records = ws.get_all_records()
-        updated = False
-
-        for i, r in enumerate(records, start=2):  # start=2 for row index
-            sid_in_sheet = str(r.get("SID", "")).strip()
-            if sid_in_sheet == sid:
-                ws.update_cell(i, status_col, status)
-                ws.update_cell(i, error_col, error_code or error_message)
-                print(f"[STATUS] ✅ Updated row {i} for SID {sid} → {status}")
-                updated = True
-                break
+    _status_q.put((sid, status, error_code or error_message, to_number))
+    return "OK", 200
 
-        if not updated:
-            ws.append_row([
-                datetime.now().strftime("%d-%m-%Y %H:%M"),
-                "", to_number, "Status Update",
-                "", status, error_code or error_message, sid
-            ])
-            print(f"[STATUS] ➕ Appended new row for SID {sid}")
+# ==========================
+# ❤️ Health check
+# ==========================
+_HEALTH_PREFIX = b'{"status":"ok","service":"sardaarji-whatsapp-webhook","time":"'
 
-    except Exception as e:
-        print("[ERROR] Failed to update status in sheet:", e)
-        traceback.print_exc()
+@app.get("/health")
+def health_check():
+    # No Sheets access: liveness probes should stay cheap
+    return Response(_HEALTH_PREFIX + iso_now().encode() + b'"}',
+                    mimetype="application/json",
+                    headers={"Cache-Control": "no-store"})
 
-    return "OK", 200
+# ==========================
+# 🔄 Admin: rebuild phone index
+# ==========================
+@app.post("/admin/reload")
+def admin_reload():
+    # Fail closed: without a configured token the route is disabled
+    token = request.headers.get("X-Admin-Token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        abort(403)
+
+    try:
+        build_phone_index()
+    except Exception:
+        logger.exception("[ERROR] Failed to rebuild phone index")
+        return "Reload failed", 500
+
+    return f"Reloaded {len(PHONE_INDEX)} phones", 200
 
 
 # ==========================
 # 🚀 Entrypoint
 # ==========================
+# Production runs under gunicorn gthread workers (see Procfile); this is for local runs only
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))